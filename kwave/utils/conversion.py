@@ -7,6 +7,7 @@ from numpy import ndarray
 from beartype import beartype as typechecker
 from beartype.typing import Tuple, Union
 from jaxtyping import Real, Float, Num
+from numba import njit, prange
 
 from kwave.kgrid import kWaveGrid
 from kwave.utils.matlab import matlab_mask
@@ -340,6 +341,35 @@ def hounsfield2soundspeed(
     return sound_speed
 
 
+@njit(["void(f4[::1], f8[::1])", "void(f8[::1], f8[::1])"], parallel=True, cache=True)
+def _hounsfield2density_core(ct_data: np.ndarray, density: np.ndarray) -> None:
+    """
+    Apply the piecewise linear fits of `hounsfield2density` to flattened CT data in a single pass.
+
+    Args:
+        ct_data: The flattened CT data in Hounsfield units.
+        density: The flattened output buffer, written in place.
+
+    """
+    for i in prange(ct_data.size):
+        value = ct_data[i]
+        if value < 930:
+            # Part 1: Less than 930 Hounsfield Units
+            density[i] = 1.025793065681423 * value - 5.680404011488714
+        elif value <= 1098:
+            # Part 2: Between 930 and 1098 (soft tissue region)
+            density[i] = 0.9082709691264 * value + 103.6151457847139
+        elif value < 1260:
+            # Part 3: Between 1098 and 1260 (between soft tissue and bone)
+            density[i] = 0.5108369316599 * value + 539.9977189228704
+        elif value >= 1260:
+            # Part 4: Greater than 1260 (bone region)
+            density[i] = 0.6625370912451 * value + 348.8555178455294
+        else:
+            # NaN values do not fall into any region
+            density[i] = 0
+
+
 @typechecker
 def hounsfield2density(
     ct_data: Union[Float[ndarray, "Dim1 Dim2"], Float[ndarray, "Dim1 Dim2 Dim3"]], plot_fitting: bool = False
@@ -356,23 +386,11 @@ def hounsfield2density(
 
     """
 
-    # create empty density matrix
-    density = np.zeros(ct_data.shape, like=ct_data)
-
     # apply conversion in several parts using linear fits to the data
-    # Part 1: Less than 930 Hounsfield Units
-    density[ct_data < 930] = np.polyval([1.025793065681423, -5.680404011488714], ct_data[ct_data < 930])
-
-    # Part 2: Between 930 and 1098(soft tissue region)
-    index_selection = np.logical_and(930 <= ct_data, ct_data <= 1098)
-    density[index_selection] = np.polyval([0.9082709691264, 103.6151457847139], ct_data[index_selection])
-
-    # Part 3: Between 1098 and 1260(between soft tissue and bone)
-    index_selection = np.logical_and(1098 < ct_data, ct_data < 1260)
-    density[index_selection] = np.polyval([0.5108369316599, 539.9977189228704], ct_data[index_selection])
-
-    # Part 4: Greater than 1260(bone region)
-    density[ct_data >= 1260] = np.polyval([0.6625370912451, 348.8555178455294], ct_data[ct_data >= 1260])
+    if ct_data.dtype != np.float32:
+        ct_data = ct_data.astype(np.float64, copy=False)
+    density = np.empty(ct_data.shape)
+    _hounsfield2density_core(np.ravel(ct_data), density.reshape(-1))
 
     if plot_fitting:
         raise NotImplementedError("Plotting function not implemented in Python")
@@ -1,15 +1,16 @@
+import functools
 import logging
 import math
 from math import floor
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy
 from scipy import optimize
+from numba import njit, prange
 from beartype import beartype as typechecker
 from beartype.typing import Union, List, Tuple, cast, Optional
-from jaxtyping import Float, Complex, Int, Real, Integer
+from jaxtyping import Bool, Float, Complex, Int, Real, Integer
 
 from .conversion import db2neper, neper2db
 from .data import scale_SI
@@ -123,6 +124,8 @@ def make_cart_disc(
 
     # plot results
     if plot_disc:
+        import matplotlib.pyplot as plt
+
         # select suitable axis scaling factor
         _, scale, prefix, unit = scale_SI(np.max(disc))
 
@@ -213,6 +216,8 @@ def make_cart_bowl(
 
     # plot results
     if plot_bowl is True:
+        import matplotlib.pyplot as plt
+
         # select suitable axis scaling factor
         _, scale, prefix, unit = scale_SI(np.max(bowl))
 
@@ -264,6 +269,38 @@ def get_spaced_points(start: float, stop: float, n: int = 100, spacing: str = "l
         raise ValueError(f"`spacing` {spacing} is not a valid argument. Choose from 'linear' or 'log'.")
 
 
+@njit("f8(f8, f8, f8[::1], f8[::1], f8[::1], f8)", fastmath={"contract"}, cache=True)
+def _power_law_fit_error(a0_np: float, y: float, w: np.ndarray, log_w: np.ndarray, desired_absorption: np.ndarray, c0: float) -> float:
+    """
+    Second-order absorption error used by `fit_power_law_params`.
+
+    Args:
+        a0_np: trial power law coefficient [Nepers/((rad/s)^y m)]
+        y: trial power law exponent
+        w: frequency axis [rad/s]
+        log_w: natural logarithm of `w`
+        desired_absorption: target absorption at each frequency [Nepers/m]
+        c0: speed of sound in the medium [m/s]
+
+    Returns:
+        The absorption error.
+
+    """
+    # loop invariant factor of the denominator
+    scale = (y + 1) * a0_np * c0 * math.tan(math.pi * y / 2)
+
+    error_sq = 0.0
+    for i in range(w.size):
+        w_pow = math.exp(y * log_w[i])
+
+        # actual absorption of the fractional Laplacian wave equation
+        actual_absorption = a0_np * w_pow / (1 - scale * w_pow / w[i])
+        residual = desired_absorption[i] - actual_absorption
+        error_sq += residual * residual
+
+    return math.sqrt(error_sq)
+
+
 def fit_power_law_params(a0: float, y: float, c0: float, f_min: float, f_max: float, plot_fit: bool = False) -> Tuple[float, float]:
     """
     Calculate absorption parameters that fit a power law over a given frequency range.
@@ -299,19 +336,13 @@ def fit_power_law_params(a0: float, y: float, c0: float, f_min: float, f_max: fl
     # convert user defined a0 to Nepers/((rad/s)^y m)
     a0_np = db2neper(a0, y)
 
+    # the frequency axis is fixed during the fit, so only evaluate its logarithm once
+    log_w = np.log(w)
     desired_absorption = a0_np * w**y
 
     def abs_func(trial_vals):
         """Second-order absorption error"""
-        a0_np_trial, y_trial = trial_vals
-
-        actual_absorption = (
-            a0_np_trial * w**y_trial / (1 - (y_trial + 1) * a0_np_trial * c0 * np.tan(np.pi * y_trial / 2) * w ** (y_trial - 1))
-        )
-
-        absorption_error = np.sqrt(np.sum((desired_absorption - actual_absorption) ** 2))
-
-        return absorption_error
+        return _power_law_fit_error(trial_vals[0], trial_vals[1], w, log_w, desired_absorption, c0)
 
     a0_np_fit, y_fit = optimize.fmin(abs_func, [a0_np, y])
 
@@ -346,15 +377,89 @@ def power_law_kramers_kronig(w: np.ndarray, w0: float, c0: float, a0: float, y:
     if 0 >= y or y >= 3:
         logging.log(logging.WARN, f"{UserWarning.__name__}: y must be within the interval (0,3)")
         warnings.warn("y must be within the interval (0,3)", UserWarning)
-        c_kk = c0 * np.ones_like(w)
-    elif y == 1:
+        return c0 * np.ones_like(w)
+
+    # evaluate the expression in a single output buffer to avoid array temporaries
+    w = np.asarray(w, dtype=float)
+    c_kk = np.empty_like(w)
+
+    if y == 1:
         # Kramers-Kronig for y = 1
-        c_kk = 1 / (1 / c0 - 2 * a0 * np.log(w / w0) / np.pi)
+        np.divide(w, w0, out=c_kk)
+        np.log(c_kk, out=c_kk)
+        c_kk *= 2 * a0
+        c_kk /= math.pi
+        np.subtract(1 / c0, c_kk, out=c_kk)
     else:
         # Kramers-Kronig for 0 < y < 1 and 1 < y < 3
-        c_kk = 1 / (1 / c0 + a0 * np.tan(y * np.pi / 2) * (w ** (y - 1) - w0 ** (y - 1)))
+        np.power(w, y - 1, out=c_kk)
+        c_kk -= w0 ** (y - 1)
+        c_kk *= a0 * math.tan(y * math.pi / 2)
+        c_kk += 1 / c0
+
+    np.reciprocal(c_kk, out=c_kk)
+
+    # return a scalar for a scalar frequency
+    return c_kk[()] if c_kk.ndim == 0 else c_kk
+
 
-    return c_kk
+# one specialisation per number of coefficients used by the water_* functions
+_POLYVAL_SIZES = (5, 6, 8)
+
+
+@njit([f"f8(UniTuple(f8, {n}), f8)" for n in _POLYVAL_SIZES], cache=True)
+def _polyval_horner(p: Tuple[float, ...], x: float) -> float:
+    """
+    Evaluate a polynomial at a scalar using Horner's rule.
+
+    Args:
+        p: polynomial coefficients, highest power first (as in `np.polyval`)
+        x: the value at which to evaluate the polynomial
+
+    Returns:
+        The value of the polynomial at `x`.
+
+    """
+    y = 0.0
+    for coeff in p:
+        y = y * x + coeff
+    return y
+
+
+@njit([f"void(UniTuple(f8, {n}), f8[::1], f8[::1])" for n in _POLYVAL_SIZES], parallel=True, cache=True)
+def _polyval_horner_array(p: Tuple[float, ...], x: np.ndarray, out: np.ndarray) -> None:
+    """
+    Evaluate a polynomial at every element of a flattened array using Horner's rule.
+
+    Args:
+        p: polynomial coefficients, highest power first (as in `np.polyval`)
+        x: the flattened values at which to evaluate the polynomial
+        out: the flattened output buffer, written in place
+
+    """
+    for i in prange(x.size):
+        out[i] = _polyval_horner(p, x[i])
+
+
+def _polyval(p: Tuple[float, ...], x: Union[kt.NUMERIC, np.ndarray]) -> Union[float, np.ndarray]:
+    """
+    Evaluate a polynomial at a scalar or an array of any shape in a single pass.
+
+    Args:
+        p: polynomial coefficients, highest power first (as in `np.polyval`)
+        x: the value(s) at which to evaluate the polynomial
+
+    Returns:
+        The value(s) of the polynomial, with the same shape as `x`.
+
+    """
+    if np.ndim(x) == 0:
+        return _polyval_horner(p, float(x))
+
+    x = np.asarray(x, dtype=float)
+    out = np.empty(x.shape)
+    _polyval_horner_array(p, x.ravel(), out.reshape(-1))
+    return out
 
 
 def water_absorption(f: float, temp: Union[float, kt.NP_DOMAIN]) -> Union[float, kt.NP_DOMAIN]:
@@ -388,7 +493,7 @@ def water_absorption(f: float, temp: Union[float, kt.NP_DOMAIN]) -> Union[float,
 
     # conversion factor between Nepers and dB NEPER2DB = 8.686;
     # coefficients for 7th order polynomial fit
-    a = [
+    a = (
         56.723531840522710,
         -2.899633796917384,
         0.099253401567561,
@@ -397,12 +502,10 @@ def water_absorption(f: float, temp: Union[float, kt.NP_DOMAIN]) -> Union[float,
         -6.210860973978427e-008,
         -6.402634551821596e-010,
         3.869387679459408e-012,
-    ]
+    )
 
-    # compute absorption
-    a_on_fsqr = (
-        a[0] + a[1] * temp + a[2] * temp**2 + a[3] * temp**3 + a[4] * temp**4 + a[5] * temp**5 + a[6] * temp**6 + a[7] * temp**7
-    ) * 1e-17
+    # compute absorption, evaluating the polynomial with Horner's rule
+    a_on_fsqr = _polyval(a[::-1], temp) * 1e-17
 
     abs = NEPER2DB * 1e12 * f**2 * a_on_fsqr
     return abs
@@ -432,8 +535,8 @@ def water_sound_speed(temp: Union[float, kt.NP_DOMAIN]) -> Union[float, kt.NP_DO
         raise ValueError("`temp` must be between 0 and 95.")
 
     # find value
-    p = [2.787860e-9, -1.398845e-6, 3.287156e-4, -5.779136e-2, 5.038813, 1.402385e3]
-    c = np.polyval(p, temp)
+    p = (2.787860e-9, -1.398845e-6, 3.287156e-4, -5.779136e-2, 5.038813, 1.402385e3)
+    c = _polyval(p, temp)
     return c
 
 
@@ -464,7 +567,8 @@ def water_density(temp: Union[kt.NUMERIC, np.ndarray]) -> Union[kt.NUMERIC, np.n
         raise ValueError("`temp` must be between 5 and 40.")
 
     # calculate density of air-saturated water
-    density = 999.84847 + 6.337563e-2 * temp - 8.523829e-3 * temp**2 + 6.943248e-5 * temp**3 - 3.821216e-7 * temp**4
+    p = (-3.821216e-7, 6.943248e-5, -8.523829e-3, 6.337563e-2, 999.84847)
+    density = _polyval(p, temp)
     return density
 
 
@@ -494,11 +598,60 @@ def water_non_linearity(temp: Union[float, kt.NP_DOMAIN]) -> Union[float, kt.NP_
         raise ValueError("`temp` must be between 0 and 100.")
 
     # find value
-    p = [-4.587913769504693e-08, 1.047843302423604e-05, -9.355518377254833e-04, 5.380874771364909e-2, 4.186533937275504]
-    BonA = np.polyval(p, temp)
+    p = (-4.587913769504693e-08, 1.047843302423604e-05, -9.355518377254833e-04, 5.380874771364909e-2, 4.186533937275504)
+    BonA = _polyval(p, temp)
     return BonA
 
 
+@njit("i8(f8)", cache=True)
+def _squared_radius_threshold(radius: float) -> int:
+    """
+    Return the largest integer squared distance whose square root does not exceed `radius`.
+
+    Comparing integer squared distances against this threshold gives the same
+    result as comparing the (rounded) distance against `radius`, without
+    evaluating a square root per grid point.
+
+    """
+    radius_sq = int(math.floor(radius * radius))
+    while math.sqrt(radius_sq + 1) <= radius:
+        radius_sq += 1
+    while radius_sq >= 0 and math.sqrt(radius_sq) > radius:
+        radius_sq -= 1
+    return radius_sq
+
+
+@njit(["void(b1[:, :, ::1], i8, i8, i8, f8)", "void(i8[:, :, ::1], i8, i8, i8, f8)"], parallel=True, cache=True)
+def _make_ball_core(ball: np.ndarray, cx: int, cy: int, cz: int, radius: float) -> None:
+    """
+    Set the grid points of a 3D grid that lie within a ball.
+
+    Distances are measured with periodic wrapping, so if part of the ball
+    overlaps the grid edge, the rest of the ball wraps to the opposite side.
+    Squared distances are compared, so no distance map is formed.
+
+    Args:
+        ball: 3D grid to write the ball into (modified in place).
+        cx: x-coordinate of the ball centre (1-based).
+        cy: y-coordinate of the ball centre (1-based).
+        cz: z-coordinate of the ball centre (1-based).
+        radius: ball radius [grid points].
+
+    """
+    radius_sq = _squared_radius_threshold(radius)
+
+    Nx, Ny, Nz = ball.shape
+    ox, oy, oz = (Nx + 1) // 2, (Ny + 1) // 2, (Nz + 1) // 2
+    for i in prange(Nx):
+        dx = (i - cx + ox) % Nx - ox + 1
+        for j in range(Ny):
+            dy = (j - cy + oy) % Ny - oy + 1
+            for k in range(Nz):
+                dz = (k - cz + oz) % Nz - oz + 1
+                if dx * dx + dy * dy + dz * dz <= radius_sq:
+                    ball[i, j, k] = 1
+
+
 @typechecker
 def make_ball(
     grid_size: Vector, ball_center: Vector, radius: int, plot_ball: bool = False, binary: bool = False
@@ -518,8 +671,6 @@ def make_ball(
 
     """
 
-    # define literals
-    MAGNITUDE = 1
     assert grid_size.shape == (3,), "grid_size must be a 3 element vector"
     assert ball_center.shape == (3,), "ball_center must be a 3 element vector"
 
@@ -533,17 +684,10 @@ def make_ball(
             ball_center[i] = int(floor(grid_size[i] / 2)) + 1
 
     # create empty matrix
-    ball = np.zeros(grid_size).astype(bool if binary else int)
-
-    # define np.pixel map
-    r = make_pixel_map(grid_size, shift=[0, 0, 0])
+    ball = np.zeros(grid_size, dtype=bool if binary else np.int64)
 
     # create ball
-    ball[r <= radius] = MAGNITUDE
-
-    # shift centre
-    ball_center = ball_center - np.ceil(grid_size / 2).astype(int)
-    ball = np.roll(ball, ball_center, axis=(0, 1, 2))
+    _make_ball_core(ball, int(ball_center[0]), int(ball_center[1]), int(ball_center[2]), float(radius))
 
     # plot results
     if plot_ball:
@@ -588,6 +732,8 @@ def make_cart_sphere(
 
     # plot results
     if plot_sphere:
+        import matplotlib.pyplot as plt
+
         # select suitable axis scaling factor
         [x_sc, scale, prefix, _] = scale_SI(np.max(sphere))
 
@@ -607,8 +753,13 @@ def make_cart_sphere(
 
 
 def make_cart_circle(
-    radius: float, num_points: int, center_pos: Vector = Vector([0, 0]), arc_angle: float = 2 * np.pi, plot_circle: bool = False
-) -> Float[np.ndarray, "2 NumPoints"]:
+    radius: float,
+    num_points: int,
+    center_pos: Vector = Vector([0, 0]),
+    arc_angle: float = 2 * np.pi,
+    plot_circle: bool = False,
+    layout: str = "SoA",
+) -> Union[Float[np.ndarray, "2 NumPoints"], Float[np.ndarray, "NumPoints 2"]]:
     """
     Create a set of points in cartesian coordinates defining a circle or arc.
 
@@ -620,12 +771,19 @@ def make_cart_circle(
         center_pos: center position of the circle or arc
         arc_angle: arc angle in radians
         plot_circle: whether to plot the circle or arc
+        layout: memory layout of the points, either 'SoA' (one row per coordinate) or 'AoS' (one row per point)
 
     Returns:
-        2 x `num_points` array of cartesian coordinates
+        2 x `num_points` array of cartesian coordinates, or `num_points` x 2 for the 'AoS' layout
+
+    Raises:
+        ValueError: if `layout` is not 'SoA' or 'AoS'
 
     """
 
+    if layout not in ("SoA", "AoS"):
+        raise ValueError(f"`layout` {layout} is not a valid argument. Choose from 'SoA' or 'AoS'.")
+
     # check for arc_angle input
     if arc_angle == 2 * np.pi:
         full_circle = True
@@ -637,20 +795,32 @@ def make_cart_circle(
     # create angles
     angles = np.arange(0, num_points) * arc_angle / n_steps + np.pi / 2
 
-    # create cartesian grid
-    circle = np.concatenate([radius * np.cos(angles[np.newaxis, :]), radius * np.sin(-angles[np.newaxis])])
+    # create cartesian grid, writing each coordinate directly into its row
+    # of the requested layout
+    if layout == "SoA":
+        circle = np.empty((2, angles.size))
+        coords = circle
+    else:
+        circle = np.empty((angles.size, 2))
+        coords = circle.T
+    np.cos(angles, out=coords[0])
+    np.sin(angles, out=coords[1])
+    coords[0] *= radius
+    coords[1] *= -radius
 
     # offset if needed
-    circle = circle + center_pos[:, None]
+    coords += np.asarray(center_pos, dtype=float)[:, None]
 
     # plot results
     if plot_circle:
+        import matplotlib.pyplot as plt
+
         # select suitable axis scaling factor
         [_, scale, prefix, _] = scale_SI(np.max(abs(circle)))
 
         # create the figure
         plt.figure()
-        plt.plot(circle[1, :] * scale, circle[0, :] * scale, "b.")
+        plt.plot(coords[1, :] * scale, coords[0, :] * scale, "b.")
         plt.xlabel([f"y-position [{prefix} m]"])
         plt.ylabel([f"x-position [{prefix} m]"])
         plt.axis("equal")
@@ -659,6 +829,32 @@ def make_cart_circle(
     return np.squeeze(circle)
 
 
+@njit("void(b1[:, ::1], i8, i8, f8)", parallel=True, cache=True)
+def _make_disc_core(disc: np.ndarray, cx: int, cy: int, radius: float) -> None:
+    """
+    Set the grid points of a 2D grid that lie within a disc.
+
+    See `_make_ball_core` for the wrapping convention.
+
+    Args:
+        disc: 2D grid to write the disc into (modified in place).
+        cx: x-coordinate of the disc centre (1-based).
+        cy: y-coordinate of the disc centre (1-based).
+        radius: disc radius [grid points].
+
+    """
+    radius_sq = _squared_radius_threshold(radius)
+
+    Nx, Ny = disc.shape
+    ox, oy = (Nx + 1) // 2, (Ny + 1) // 2
+    for i in prange(Nx):
+        dx = (i - cx + ox) % Nx - ox + 1
+        for j in range(Ny):
+            dy = (j - cy + oy) % Ny - oy + 1
+            if dx * dx + dy * dy <= radius_sq:
+                disc[i, j] = 1
+
+
 @typechecker
 def make_disc(grid_size: Vector, center: Vector, radius, plot_disc=False) -> kt.NP_ARRAY_BOOL_2D:
     """
@@ -684,9 +880,6 @@ def make_disc(grid_size: Vector, center: Vector, radius, plot_disc=False) -> kt.
     assert len(grid_size) == 2, "Grid size must be 2D."
     assert len(center) == 2, "Center must be 2D."
 
-    # define literals
-    MAGNITUDE = 1
-
     # force integer values
     grid_size = grid_size.round().astype(int)
     center = center.round().astype(int)
@@ -701,15 +894,8 @@ def make_disc(grid_size: Vector, center: Vector, radius, plot_disc=False) -> kt.
     # create empty matrix
     disc = np.zeros(grid_size, dtype=bool)
 
-    # define np.pixel map
-    r = make_pixel_map(grid_size, shift=[0, 0])
-
     # create disc
-    disc[r <= radius] = MAGNITUDE
-
-    # shift centre
-    center = center - np.ceil(grid_size / 2).astype(int)
-    disc = np.roll(disc, center, axis=(0, 1))
+    _make_disc_core(disc, int(center.x), int(center.y), float(radius))
 
     # create the figure
     if plot_disc:
@@ -717,10 +903,114 @@ def make_disc(grid_size: Vector, center: Vector, radius, plot_disc=False) -> kt.
     return disc
 
 
+@njit("b1(i8, i8, f8, f8, f8)", cache=True)
+def _in_arc(dx: int, dy: int, arc_angle: float, cos_half: float, sin_half: float) -> bool:
+    """
+    Check whether a point lies within the arc drawn by `make_circle`.
+
+    This is equivalent to ``atan2(dx, dy) + pi <= arc_angle`` for arcs shorter than a full circle, but
+    compares the point with the bisector of the arc instead. atan2 is only evaluated for points that lie
+    within rounding distance of the ends of the arc.
+
+    Args:
+        dx: x-offset of the point from the circle centre [grid points].
+        dy: y-offset of the point from the circle centre [grid points].
+        arc_angle: angle of the circular arc [rad].
+        cos_half: cosine of half the arc angle.
+        sin_half: sine of half the arc angle.
+
+    Returns:
+        Whether the point lies within the arc.
+
+    """
+
+    # the point straight along -y sits at the 2*pi end of the arc
+    if dx == 0 and dy < 0:
+        return False
+
+    # compare the angle between the point and the arc bisector with half the arc angle
+    dot = -dy * cos_half - dx * sin_half
+    dist_sq = dx * dx + dy * dy
+    margin = dot * dot - dist_sq * cos_half * cos_half
+    if abs(margin) > 1e-9 * dist_sq and dot * dot > 1e-18 * dist_sq:
+        if cos_half >= 0:
+            return dot > 0 and margin > 0
+        return dot > 0 or margin < 0
+
+    return (math.atan2(dx, dy) + math.pi) <= arc_angle
+
+
+@njit("void(b1[:, ::1], i8, i8, i8, f8)", cache=True)
+def _make_circle_core(circle: np.ndarray, cx: int, cy: int, radius: int, arc_angle: float) -> None:
+    """
+    Rasterise a circle (or arc) into a grid using the midpoint circle algorithm.
+
+    Only the points of the circle are written, so the grid should be allocated with np.zeros, which lets the
+    operating system provide the untouched parts of large grids as zero pages.
+
+    Args:
+        circle: the 2D grid to draw into, written in place.
+        cx: x-coordinate of the circle centre (1-based).
+        cy: y-coordinate of the circle centre (1-based).
+        radius: radius of the circle [grid points].
+        arc_angle: angle of the circular arc [rad].
+
+    """
+    Nx, Ny = circle.shape
+
+    # every point lies within a full circle, otherwise precompute the arc bisector
+    full_circle = arc_angle >= 2 * math.pi
+    cos_half = math.cos(arc_angle / 2)
+    sin_half = math.sin(arc_angle / 2)
+
+    # initialise loop variables
+    x = 0
+    y = radius
+    d = 1 - radius
+
+    if (cx >= 1) and (cx <= Nx) and ((cy - y) >= 1) and ((cy - y) <= Ny):
+        circle[cx - 1, cy - y - 1] = True
+
+    # draw the remaining cardinal points
+    for px_i, py_i in ((cx, cy + y), (cx + y, cy), (cx - y, cy)):
+        # check whether the point is within the arc made by arc_angle, and lies
+        # within the grid
+        if full_circle or _in_arc(px_i - cx, py_i - cy, arc_angle, cos_half, sin_half):
+            if (px_i >= 1) and (px_i <= Nx) and (py_i >= 1) and (py_i <= Ny):
+                circle[px_i - 1, py_i - 1] = True
+
+    # loop through the remaining points using the midpoint circle algorithm
+    while x < (y - 1):
+        x = x + 1
+        if d < 0:
+            d = d + x + x + 1
+        else:
+            y = y - 1
+            a = x - y + 1
+            d = d + a + a
+
+        # loop through each point (break coding standard for readability)
+        for px_i, py_i in (
+            (x + cx, y + cy),
+            (y + cx, x + cy),
+            (y + cx, -x + cy),
+            (x + cx, -y + cy),
+            (-x + cx, -y + cy),
+            (-y + cx, -x + cy),
+            (-y + cx, x + cy),
+            (-x + cx, y + cy),
+        ):
+            # check whether the point is within the arc made by arc_angle, and
+            # lies within the grid
+            if full_circle or _in_arc(px_i - cx, py_i - cy, arc_angle, cos_half, sin_half):
+                if (px_i >= 1) and (px_i <= Nx) and (py_i >= 1) and (py_i <= Ny):
+                    circle[px_i - 1, py_i - 1] = True
+
+
 @typechecker
 def make_circle(
     grid_size: Vector, center: Vector, radius: Real[kt.ScalarLike, ""], arc_angle: Optional[float] = None, plot_circle: bool = False
-) -> kt.NP_ARRAY_INT_2D:
+) -> kt.NP_ARRAY_BOOL_2D:
     """
     Create a binary map of a circle within a 2D grid.
 
@@ -745,9 +1035,6 @@ def make_circle(
     assert len(grid_size) == 2, "Grid size must be 2D"
     assert len(center) == 2, "Center must be 2D"
 
-    # define literals
-    MAGNITUDE = 1
-
     if arc_angle is None:
         arc_angle = 2 * np.pi
     elif arc_angle > 2 * np.pi:
@@ -765,50 +1052,13 @@ def make_circle(
     center.y = center.y if center.y != 0 else int(floor(grid_size.y / 2)) + 1
     cx, cy = center
 
-    # create empty matrix
-    circle = np.zeros(grid_size, dtype=int)
-
-    # initialise loop variables
-    x = 0
-    y = radius
-    d = 1 - radius
-
-    if (cx >= 1) and (cx <= grid_size.x) and ((cy - y) >= 1) and ((cy - y) <= grid_size.y):
-        circle[cx - 1, cy - y - 1] = MAGNITUDE
-
-    # draw the remaining cardinal points
-    px = [cx, cx + y, cx - y]
-    py = [cy + y, cy, cy]
-    for point_index, (px_i, py_i) in enumerate(zip(px, py)):
-        # check whether the point is within the arc made by arc_angle, and lies
-        # within the grid
-        if (np.arctan2(px_i - cx, py_i - cy) + np.pi) <= arc_angle:
-            if (px_i >= 1) and (px_i <= grid_size.x) and (py_i >= 1) and (py_i <= grid_size.y):
-                circle[px_i - 1, py_i - 1] = MAGNITUDE
-
-    # loop through the remaining points using the midpoint circle algorithm
-    while x < (y - 1):
-        x = x + 1
-        if d < 0:
-            d = d + x + x + 1
-        else:
-            y = y - 1
-            a = x - y + 1
-            d = d + a + a
-
-        # setup point indices (break coding standard for readability)
-        px = [x + cx, y + cx, y + cx, x + cx, -x + cx, -y + cx, -y + cx, -x + cx]
-        py = [y + cy, x + cy, -x + cy, -y + cy, -y + cy, -x + cy, x + cy, y + cy]
-
-        # loop through each point
-        for point_index, (px_i, py_i) in enumerate(zip(px, py)):
-            # check whether the point is within the arc made by arc_angle, and
-            # lies within the grid
-            if (np.arctan2(px_i - cx, py_i - cy) + np.pi) <= arc_angle:
-                if (px_i >= 1) and (px_i <= grid_size.x) and (py_i >= 1) and (py_i <= grid_size.y):
-                    circle[px_i - 1, py_i - 1] = MAGNITUDE
+    # create the circle
+    circle = np.zeros((grid_size.x, grid_size.y), dtype=bool)
+    _make_circle_core(circle, int(cx), int(cy), radius, float(arc_angle))
 
     if plot_circle:
+        import matplotlib.pyplot as plt
+
         plt.imshow(circle, cmap="gray_r")
         plt.ylabel("x-position [grid points]")
         plt.xlabel("y-position [grid points]")
@@ -817,7 +1067,7 @@ def make_circle(
     return circle
 
 
-def make_pixel_map(grid_size: Vector, shift=None, origin_size="single") -> np.ndarray:
+def make_pixel_map(grid_size: Vector, shift=None, origin_size="single", dtype=np.float32) -> np.ndarray:
     """
     Generates a matrix with values of the distance of each pixel from the center of a grid.
 
@@ -829,6 +1079,7 @@ def make_pixel_map(grid_size: Vector, shift=None, origin_size="single") -> np.nd
     Args:
         grid_size: A 2D or 3D vector of the grid size in grid points.
         *args: additional optional arguments
+        dtype: The floating point type of the returned map.
 
     Returns:
         r: pixel-radius
@@ -881,36 +1132,42 @@ def make_pixel_map(grid_size: Vector, shift=None, origin_size="single") -> np.nd
 
     if map_dimension == 2:
         # create the maps for each dimension
-        nx = create_pixel_dim(Nx, origin_size, shift[0])
-        ny = create_pixel_dim(Ny, origin_size, shift[1])
-
-        # create plaid grids
-        r_x, r_y = np.meshgrid(nx, ny, indexing="ij")
+        nx = create_pixel_dim(Nx, origin_size, shift[0], dtype)
+        ny = create_pixel_dim(Ny, origin_size, shift[1], dtype)
 
-        # extract the pixel radius
-        r = np.sqrt(r_x**2 + r_y**2)
+        # accumulate the squared distances by broadcasting the 1D maps
+        r = np.empty((nx.size, ny.size), dtype=dtype)
+        r[:] = np.square(nx)[:, None]
+        r += np.square(ny)[None, :]
     if map_dimension == 3:
         # create the maps for each dimension
-        nx = create_pixel_dim(Nx, origin_size, shift[0])
-        ny = create_pixel_dim(Ny, origin_size, shift[1])
-        nz = create_pixel_dim(Nz, origin_size, shift[2])
-
-        # create plaid grids
-        r_x, r_y, r_z = np.meshgrid(nx, ny, nz, indexing="ij")
-
-        # extract the pixel radius
-        r = np.sqrt(r_x**2 + r_y**2 + r_z**2)
+        nx = create_pixel_dim(Nx, origin_size, shift[0], dtype)
+        ny = create_pixel_dim(Ny, origin_size, shift[1], dtype)
+        nz = create_pixel_dim(Nz, origin_size, shift[2], dtype)
+
+        # accumulate the squared distances by broadcasting the 1D maps
+        r = np.empty((nx.size, ny.size, nz.size), dtype=dtype)
+        r[:] = np.square(nx)[:, None, None]
+        r += np.square(ny)[None, :, None]
+        r += np.square(nz)[None, None, :]
+
+    # extract the pixel radius
+    np.sqrt(r, out=r)
     return r
 
 
-def create_pixel_dim(Nx: int, origin_size: float, shift: float) -> Tuple[np.ndarray, float]:
+@functools.lru_cache(maxsize=128)
+def create_pixel_dim(Nx: int, origin_size: float, shift: float, dtype=np.float32) -> Tuple[np.ndarray, float]:
     """
     Create an array of pixel dimensions and a pixel size.
 
+    Results are cached, so the returned array is shared between calls and is read-only.
+
     Args:
         Nx: The number of pixels in the x-dimension.
         origin_size: The size of the origin in the x-dimension.
         shift: The shift of the pixels in the x-dimension.
+        dtype: The floating point type of the returned array.
 
     Returns:
         The pixel dimensions.
@@ -950,9 +1207,278 @@ def create_pixel_dim(Nx: int, origin_size: float, shift: float) -> Tuple[np.ndar
             # centre point is shifted towards the first pixel
             else:
                 nx = np.hstack([np.arange(-(Nx - 1) / 2 + 1, 0 + 1, 1), np.arange(0, (Nx - 1) / 2 + 1, 1)])
+
+    nx = nx.astype(dtype, copy=False)
+    nx.flags.writeable = False
     return nx
 
 
+# candidate steps tried by _walk_line_AtoB, listed as offsets along the
+# driving axis and across it
+_LINE_STEP_MAJOR = (0, 0, 1, 1, 1)
+_LINE_STEP_MINOR = (-1, 1, -1, 0, 1)
+
+# components of the direction of an angled line smaller than this are treated
+# as zero, so that lines along the axes step along a single axis
+_LINE_AXIS_TOL = 1e-12
+
+
+@njit("i8(i8, i8, i8, i8, i8[::1], i8[::1])", cache=True)
+def _walk_line_AtoB(ax: int, ay: int, bx: int, by: int, xs: np.ndarray, ys: np.ndarray) -> int:
+    """
+    Rasterise the line between two (0-based) grid points.
+
+    Args:
+        ax: x-coordinate of the start point.
+        ay: y-coordinate of the start point.
+        bx: x-coordinate of the end point.
+        by: y-coordinate of the end point.
+        xs: buffer for the x-coordinates of the points of the line, written in place.
+        ys: buffer for the y-coordinates of the points of the line, written in place.
+
+    Returns:
+        The number of points of the line. Points beyond the size of the buffers are counted but not stored.
+
+    """
+    n = 0
+
+    if bx == ax:  # m = +-Inf
+        # start at the end with the smallest value of y
+        if ay < by:
+            x, y, y_end = ax, ay, by
+        else:
+            x, y, y_end = bx, by, ay
+
+        # fill in the first point
+        if n < xs.size:
+            xs[n], ys[n] = x, y
+        n += 1
+
+        while y < y_end:
+            # next point
+            y = y + 1
+
+            # add the point to the line
+            if n < xs.size:
+                xs[n], ys[n] = x, y
+            n += 1
+
+        return n
+
+    # find the equation of the line
+    m = (by - ay) / (bx - ax)  # gradient of the line
+    c = ay - m * ax  # where the line crosses the y axis
+
+    if abs(m) < 1:
+        # start at the end with the smallest value of x
+        if ax < bx:
+            x, y, x_end = ax, ay, bx
+        else:
+            x, y, x_end = bx, by, ax
+
+        # fill in the first point
+        if n < xs.size:
+            xs[n], ys[n] = x, y
+        n += 1
+
+        while x < x_end:
+            # find the next point closest to the line
+            best_diff = np.inf
+            next_x, next_y = x, y
+            for k in range(5):
+                poss_x = x + _LINE_STEP_MAJOR[k]
+                poss_y = y + _LINE_STEP_MINOR[k]
+                diff = (poss_y - (m * poss_x + c)) ** 2
+                if diff < best_diff:
+                    best_diff = diff
+                    next_x, next_y = poss_x, poss_y
+            x, y = next_x, next_y
+
+            # add the point to the line
+            if n < xs.size:
+                xs[n], ys[n] = x, y
+            n += 1
+
+    else:
+        # start at the end with the smallest value of y
+        if ay < by:
+            x, y, y_end = ax, ay, by
+        else:
+            x, y, y_end = bx, by, ay
+
+        # fill in the first point
+        if n < xs.size:
+            xs[n], ys[n] = x, y
+        n += 1
+
+        while y < y_end:
+            # find the next point closest to the line
+            best_diff = np.inf
+            next_x, next_y = x, y
+            for k in range(5):
+                poss_y = y + _LINE_STEP_MAJOR[k]
+                poss_x = x + _LINE_STEP_MINOR[k]
+                diff = (poss_x - (poss_y - c) / m) ** 2
+                if diff < best_diff:
+                    best_diff = diff
+                    next_x, next_y = poss_x, poss_y
+            x, y = next_x, next_y
+
+            # add the point to the line
+            if n < xs.size:
+                xs[n], ys[n] = x, y
+            n += 1
+
+    return n
+
+
+@njit("UniTuple(i8[::1], 2)(i8, i8, i8, i8)", cache=True)
+def _line_AtoB_points(ax: int, ay: int, bx: int, by: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterise the line between two (0-based) grid points.
+
+    Returns:
+        The (0-based) x- and y-coordinates of the points of the line.
+
+    """
+
+    # the line normally has one point per step along its longer axis, but allow for the (rare) sideways steps
+    # by repeating the walk with larger buffers if they fill up
+    size = abs(bx - ax) + abs(by - ay) + 1
+    while True:
+        xs = np.empty(size, dtype=np.int64)
+        ys = np.empty(size, dtype=np.int64)
+        n = _walk_line_AtoB(ax, ay, bx, by, xs, ys)
+        if n <= size:
+            return xs[:n], ys[:n]
+        size = n
+
+
+@njit("UniTuple(i8[::1], 2)(i8, i8, i8, i8, i8, i8, f8, f8, f8)", cache=True)
+def _line_angled_points(
+    Nx: int, Ny: int, x: int, y: int, sx: int, sy: int, m: float, c: float, linelength: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterise the line of a given length leaving a (1-based) grid point in a given direction.
+
+    Args:
+        Nx: number of grid points in the x-dimension.
+        Ny: number of grid points in the y-dimension.
+        x: x-coordinate of the start point.
+        y: y-coordinate of the start point.
+        sx: direction of each step in x (-1, 0 or 1).
+        sy: direction of each step in y (-1, 0 or 1).
+        m: gradient of the line, used if both sx and sy are non-zero.
+        c: where the line crosses the y axis, used if both sx and sy are non-zero.
+        linelength: length of the line in grid points.
+
+    Returns:
+        The (0-based) x- and y-coordinates of the points of the line.
+
+    """
+
+    # every step advances one grid point along the axis the line is closest to, so the line leaves the grid
+    # within this many points
+    xs = np.empty(max(Nx, Ny) + 1, dtype=np.int64)
+    ys = np.empty_like(xs)
+
+    # fill in the first point, unless it lies outside the grid
+    if x < 1 or x > Nx or y < 1 or y > Ny:
+        return xs[:0], ys[:0]
+    xs[0], ys[0] = x - 1, y - 1
+    n = 1
+
+    if linelength <= 0:
+        return xs[:n], ys[:n]
+
+    # every line leaves the grid before it is as long as the grid diagonal, so clamp longer (or infinite) lengths to
+    # it, which also keeps the squared length below within range of an integer
+    max_length = math.sqrt(Nx * Nx + Ny * Ny)
+    if not linelength <= max_length:
+        linelength = max_length
+
+    # find the smallest integer squared length whose square root reaches the requested length, so the length of
+    # the line can be checked without evaluating a square root per step
+    linelength_sq = math.ceil(linelength * linelength)
+    while linelength_sq > 0 and math.sqrt(linelength_sq - 1) >= linelength:
+        linelength_sq -= 1
+    while math.sqrt(linelength_sq) < linelength:
+        linelength_sq += 1
+
+    # every step advances one grid point along the axis the line is closest to
+    step = 0
+    while True:
+        step += 1
+
+        if sx == 0 or sy == 0:
+            next_x = x + sx * step
+            next_y = y + sy * step
+        elif abs(m) <= 1:
+            # step along x and round y to the closer of the two neighbouring grid points, resolving ties
+            # towards the start point as the search over the neighbouring points did
+            next_x = x + sx * step
+            true_y = m * next_x + c
+            next_y = math.floor(true_y)
+            resid_lower = true_y - next_y
+            resid_upper = next_y + 1 - true_y
+            if (resid_upper < resid_lower) if sy > 0 else (resid_upper <= resid_lower):
+                next_y += 1
+        else:
+            # step along y and round x to the closer of the two neighbouring grid points, resolving ties
+            # towards the diagonal step as the search over the neighbouring points did
+            next_y = y + sy * step
+            next_x = math.floor((next_y - c) / m)
+            resid_lower = abs(next_y - (m * next_x + c))
+            resid_upper = abs(next_y - (m * (next_x + 1) + c))
+            if (resid_upper <= resid_lower) if sx > 0 else (resid_upper < resid_lower):
+                next_x += 1
+
+        # stop the points incrementing at the edges
+        if next_x < 1 or next_x > Nx or next_y < 1 or next_y > Ny:
+            break
+
+        # add the point to the line
+        xs[n], ys[n] = next_x - 1, next_y - 1
+        n += 1
+
+        # stop once the line has reached the requested length
+        if (next_x - x) * (next_x - x) + (next_y - y) * (next_y - y) >= linelength_sq:
+            break
+
+    return xs[:n], ys[:n]
+
+
+@njit("void(b1[:, ::1], i8[::1], i8[::1])", cache=True)
+def _draw_line_points(line: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+    """
+    Set the (0-based) points of a line in a grid, written in place.
+
+    """
+    for i in range(xs.size):
+        line[xs[i], ys[i]] = True
+
+
+@njit("void(b1[:, ::1], i8[::1], i8[::1], i8[::1], i8[::1], f8[::1], f8[::1], f8[::1])", cache=True)
+def _draw_lines_angled(
+    line: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    sx: np.ndarray,
+    sy: np.ndarray,
+    m: np.ndarray,
+    c: np.ndarray,
+    linelength: np.ndarray,
+) -> None:
+    """
+    Rasterise several lines into the same grid, with the arguments of `_line_angled_points` given per line.
+
+    """
+    Nx, Ny = line.shape
+    for k in range(x.size):
+        xs, ys = _line_angled_points(Nx, Ny, x[k], y[k], sx[k], sy[k], m[k], c[k], linelength[k])
+        _draw_line_points(line, xs, ys)
+
+
 @typechecker
 def make_line(
     grid_size: Vector,
@@ -960,7 +1486,8 @@ def make_line(
     endpoint: Optional[Union[Tuple[Int[kt.ScalarLike, ""], Int[kt.ScalarLike, ""]], Int[np.ndarray, "2"]]] = None,
     angle: Optional[Float[kt.ScalarLike, ""]] = None,
     length: Optional[Int[kt.ScalarLike, ""]] = None,
-) -> kt.NP_ARRAY_BOOL_2D:
+    return_coords: bool = False,
+) -> Union[kt.NP_ARRAY_BOOL_2D, Tuple[np.ndarray, np.ndarray]]:
     """
     Generate a line shape with a given start and end point, angle, or length.
 
@@ -973,10 +1500,13 @@ def make_line(
                 If not specified, the line is drawn from the start point to the end point.
         length: The length of the line in pixels.
                 If not specified, the line is drawn from the start point to the end point.
+        return_coords: If True, return the (0-based) indices of the points of the line instead of the binary map,
+                so that no grid is allocated. The map is then given by ``line[xs, ys] = 1``.
 
     Returns:
         line: A 2D array of the same size as the input parameters,
-                with a value of 1 for pixels that are part of the line and 0 for pixels that are not.
+                with a value of 1 for pixels that are part of the line and 0 for pixels that are not,
+                or the tuple (xs, ys) of the point indices if return_coords is True.
     """
     assert len(grid_size) == 2, "Grid size must be a 2-element vector."
 
@@ -988,7 +1518,7 @@ def make_line(
         raise ValueError("startpoint should be a two-element vector.")
 
     if np.any(startpoint < 1) or startpoint[0] > grid_size.x or startpoint[1] > grid_size.y:
-        ValueError("The starting point must lie within the grid, between [1 1] and [grid_size.x grid_size.y].")
+        raise ValueError("The starting point must lie within the grid, between [1 1] and [grid_size.x grid_size.y].")
 
     # =========================================================================
     # LINE BETWEEN TWO POINTS OR ANGLED LINE?
@@ -1037,296 +1567,185 @@ def make_line(
     # =========================================================================
 
     if linetype == "AtoB":
-        # define an empty grid to hold the line
-        line = np.zeros(grid_size, dtype=bool)
-
-        # find the equation of the line
-        m = (b[1] - a[1]) / (b[0] - a[0])  # gradient of the line
-        c = a[1] - m * a[0]  # where the line crosses the y axis
-
-        if abs(m) < 1:
-            # start at the end with the smallest value of x
-            if a[0] < b[0]:
-                x, y = a
-                x_end = b[0]
-            else:
-                x, y = b
-                x_end = a[0]
-
-            # fill in the first point
-            line[x, y] = 1
-
-            while x < x_end:
-                # next points to try are
-                poss_x = [x, x, x + 1, x + 1, x + 1]
-                poss_y = [y - 1, y + 1, y - 1, y, y + 1]
-
-                # find the point closest to the line
-                true_y = m * poss_x + c
-                diff = (poss_y - true_y) ** 2
-                index = matlab_find(diff == min(diff))[0]
-
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
-
-                # add the point to the line
-                line[x - 1, y - 1] = 1
-
-        elif not np.isinf(abs(m)):
-            # start at the end with the smallest value of y
-            if a[1] < b[1]:
-                x = a[0]
-                y = a[1]
-                y_end = b[1]
-            else:
-                x = b[0]
-                y = b[1]
-                y_end = a[1]
-
-            # fill in the first point
-            line[x, y] = 1
-
-            while y < y_end:
-                # next points to try are
-                poss_y = [y, y, y + 1, y + 1, y + 1]
-                poss_x = [x - 1, x + 1, x - 1, x, x + 1]
-
-                # find the point closest to the line
-                true_x = (poss_y - c) / m
-                diff = (poss_x - true_x) ** 2
-                index = matlab_find(diff == min(diff))[0]
-
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
-
-                # add the point to the line
-                line[x, y] = 1
-
-        else:  # m = +-Inf
-            # start at the end with the smallest value of y
-            if a[1] < b[1]:
-                x = a[0]
-                y = a[1]
-                y_end = b[1]
-            else:
-                x = b[0]
-                y = b[1]
-                y_end = a[1]
-
-            # fill in the first point
-            line[x, y] = 1
-
-            while y < y_end:
-                # next point
-                y = y + 1
-
-                # add the point to the line
-                line[x, y] = 1
+        xs, ys = _line_AtoB_points(int(a[0]), int(a[1]), int(b[0]), int(b[1]))
 
     # =========================================================================
     # CALCULATE AN ANGLED LINE
     # =========================================================================
 
     elif linetype == "angled":
-        # define an empty grid to hold the line
-        line = np.zeros(grid_size, dtype=bool)
-
-        # start at the atart
         x, y = startpoint
 
-        # fill in the first point
-        line[x - 1, y - 1] = 1
-
-        # initialise the current length of the line
-        line_length = 0
-
-        if abs(angle) == np.pi:
-            while line_length < linelength:
-                # next point
-                y = y + 1
-
-                # stop the points incrementing at the edges
-                if y > grid_size.y:
-                    break
-
-                # add the point to the line
-                line[x - 1, y - 1] = 1
-
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
-
-        elif (angle < np.pi) and (angle > np.pi / 2):
-            # define the equation of the line
-            m = -np.tan(angle - np.pi / 2)  # gradient of the line
-            c = y - m * x  # where the line crosses the y axis
-
-            while line_length < linelength:
-                # next points to try are
-                poss_x = np.array([x - 1, x - 1, x])
-                poss_y = np.array([y, y + 1, y + 1])
-
-                # find the point closest to the line
-                true_y = m * poss_x + c
-                diff = (poss_y - true_y) ** 2
-                index = matlab_find(diff == min(diff))[0]
-
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
-
-                # stop the points incrementing at the edges
-                if (x < 0) or (y > grid_size.y - 1):
-                    break
-
-                # add the point to the line
-                line[x - 1, y - 1] = 1
-
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
-
-        elif angle == np.pi / 2:
-            while line_length < linelength:
-                # next point
-                x = x - 1
-
-                # stop the points incrementing at the edges
-                if x < 1:
-                    break
-
-                # add the point to the line
-                line[x - 1, y - 1] = 1
-
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+        # find the direction of each step from the direction of the line (the angle is measured from the negative
+        # y-axis towards the negative x-axis), treating components within rounding error of zero as zero so that
+        # the axis-aligned angles do not rely on exact floating point comparisons
+        dx, dy = -math.sin(angle), -math.cos(angle)
+        sx = int(math.copysign(1, dx)) if abs(dx) > _LINE_AXIS_TOL else 0
+        sy = int(math.copysign(1, dy)) if abs(dy) > _LINE_AXIS_TOL else 0
 
-        elif (angle < np.pi / 2) and (angle > 0):
-            # define the equation of the line
-            m = np.tan(np.pi / 2 - angle)  # gradient of the line
-            c = y - m * x  # where the line crosses the y axis
+        # equation of the line, with the gradient dy / dx evaluated as cot(angle) = sign(angle) * tan(pi / 2 - |angle|)
+        m = math.copysign(1, angle) * math.tan(math.pi / 2 - abs(angle))  # gradient of the line
+        c = y - m * x  # where the line crosses the y axis
 
-            while line_length < linelength:
-                # next points to try are
-                poss_x = np.array([x - 1, x - 1, x])
-                poss_y = np.array([y, y - 1, y - 1])
+        xs, ys = _line_angled_points(
+            int(grid_size.x), int(grid_size.y), int(x), int(y), int(sx), int(sy), float(m), float(c), float(linelength)
+        )
 
-                # find the point closest to the line
-                true_y = m * poss_x + c
-                diff = (poss_y - true_y) ** 2
-                index = matlab_find(diff == min(diff))[0]
+    if return_coords:
+        return xs, ys
 
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
+    # draw the points into an empty grid
+    line = np.zeros((grid_size.x, grid_size.y), dtype=bool)
+    _draw_line_points(line, xs, ys)
+    return line
 
-                # stop the points incrementing at the edges
-                if (x < 1) or (y < 1):
-                    break
 
-                # add the point to the line
-                line[x - 1, y - 1] = 1
+@typechecker
+def make_lines(
+    grid_size: Vector, startpoints: Int[np.ndarray, "K 2"], angles: Real[np.ndarray, " K"], lengths: Real[np.ndarray, " K"]
+) -> kt.NP_ARRAY_BOOL_2D:
+    """
+    Generate several angled lines in the same grid.
 
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+    The lines are drawn as by `make_line` with an angle and a length, but are rasterised together into a single
+    binary map, so the grid is only allocated once.
 
-        elif angle == 0:
-            while line_length < linelength:
-                # next point
-                y = y - 1
+    Args:
+        grid_size: The size of the grid in pixels.
+        startpoints: The start points of the lines, given as a (K, 2) array of x and y coordinates.
+        angles: The angles of the lines in radians, given as a (K,) array.
+        lengths: The lengths of the lines in pixels, given as a (K,) array. Infinite lengths run to the edge of the grid.
 
-                # stop the points incrementing at the edges
-                if y < 1:
-                    break
+    Returns:
+        line: A 2D array of the same size as the input parameters,
+                with a value of 1 for pixels that are part of any of the lines and 0 for pixels that are not.
+    """
+    assert len(grid_size) == 2, "Grid size must be a 2-element vector."
 
-                # add the point to the line
-                line[x - 1, y - 1] = 1
+    if not (len(angles) == len(lengths) == len(startpoints)):
+        raise ValueError("startpoints, angles and lengths must describe the same number of lines.")
 
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+    x = np.ascontiguousarray(startpoints[:, 0], dtype=np.int64)
+    y = np.ascontiguousarray(startpoints[:, 1], dtype=np.int64)
+    if np.any(x < 1) or np.any(y < 1) or np.any(x > grid_size.x) or np.any(y > grid_size.y):
+        raise ValueError("The starting points must lie within the grid, between [1 1] and [grid_size.x grid_size.y].")
 
-        elif (angle < 0) and (angle > -np.pi / 2):
-            # define the equation of the line
-            m = -np.tan(np.pi / 2 + angle)  # gradient of the line
-            c = y - m * x  # where the line crosses the y axis
+    # angles must lie between -np.pi and np.pi
+    angles = np.mod(angles, 2 * np.pi)
+    angles = np.where(angles > np.pi, angles - 2 * np.pi, angles)
 
-            while line_length < linelength:
-                # next points to try are
-                poss_x = np.array([x + 1, x + 1, x])
-                poss_y = np.array([y, y - 1, y - 1])
+    # find the direction of each step and the equation of each line, as in make_line
+    dx, dy = -np.sin(angles), -np.cos(angles)
+    sx = np.where(np.abs(dx) > _LINE_AXIS_TOL, np.sign(dx), 0).astype(np.int64)
+    sy = np.where(np.abs(dy) > _LINE_AXIS_TOL, np.sign(dy), 0).astype(np.int64)
+    m = np.copysign(1, angles) * np.tan(np.pi / 2 - np.abs(angles))  # gradient of the lines
+    c = y - m * x  # where the lines cross the y axis
 
-                # find the point closest to the line
-                true_y = m * poss_x + c
-                diff = (poss_y - true_y) ** 2
-                index = matlab_find(diff == min(diff))[0]
+    lengths = np.asarray(lengths, dtype=np.float64)
+    if np.any(np.isnan(lengths)):
+        raise ValueError("The lengths of the lines must not be NaN.")
 
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
+    line = np.zeros((grid_size.x, grid_size.y), dtype=bool)
+    _draw_lines_angled(line, x, y, sx, sy, m, c, lengths)
+    return line
 
-                # stop the points incrementing at the edges
-                if (x > grid_size.x) or (y < 1):
-                    break
 
-                # add the point to the line
-                line[x - 1, y - 1] = 1
+@njit("b1(i8, i8, i8, i8, f8, f8)", cache=True, error_model="numpy")
+def _in_arc_sector(dx: int, dy: int, v1x: int, v1y: int, l1: float, half_arc_angle: float) -> bool:
+    """
+    Check whether a point on a circle lies within the arc drawn by `make_arc`.
 
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+    Args:
+        dx: x-offset of the point from the circle centre [grid points].
+        dy: y-offset of the point from the circle centre [grid points].
+        v1x: x-component of the vector from the circle centre to the arc midpoint.
+        v1y: y-component of the vector from the circle centre to the arc midpoint.
+        l1: length of the vector from the circle centre to the arc midpoint.
+        half_arc_angle: half the angle of the arc [rad].
 
-        elif angle == -np.pi / 2:
-            while line_length < linelength:
-                # next point
-                x = x + 1
+    Returns:
+        Whether the point lies within the arc.
 
-                # stop the points incrementing at the edges
-                if x > grid_size.x:
-                    break
+    """
 
-                # add the point to the line
-                line[x - 1, y - 1] = 1
+    # calculate length of vector from the circle centre to the point
+    l2 = math.sqrt(dx * dx + dy * dy)
 
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+    # find the angle between the two vectors using the dot product, normalised using the vector lengths (clamped, so
+    # that rounding errors for points in line with the arc centre do not give a NaN)
+    cos_theta = (v1x * dx + v1y * dy) / (l1 * l2)
+    theta = math.acos(max(-1.0, min(1.0, cos_theta)))
 
-        elif (angle < -np.pi / 2) and (angle > -np.pi):
-            # define the equation of the line
-            m = np.tan(-angle - np.pi / 2)  # gradient of the line
-            c = y - m * x  # where the line crosses the y axis
+    # points at an angle greater than the half angle of the arc are not part of the arc
+    return not theta > half_arc_angle
 
-            while line_length < linelength:
-                # next points to try are
-                poss_x = np.array([x + 1, x + 1, x])
-                poss_y = np.array([y, y + 1, y + 1])
 
-                # find the point closest to the line
-                true_y = m * poss_x + c
-                diff = (poss_y - true_y) ** 2
-                index = matlab_find(diff == min(diff))[0]
+@njit("void(b1[:, ::1], i8, i8, i8, i8, i8, i8, i8, f8, f8)", cache=True)
+def _make_arc_core(
+    arc: np.ndarray, ox: int, oy: int, radius: int, cx: int, cy: int, v1x: int, v1y: int, l1: float, half_arc_angle: float
+) -> None:
+    """
+    Rasterise the arc of a circle into a grid using the midpoint circle algorithm.
 
-                # the next point
-                x = poss_x[index[0] - 1]
-                y = poss_y[index[0] - 1]
+    The points of the circle are generated as in `_make_circle_core`, but only those within the arc are written.
 
-                # stop the points incrementing at the edges
-                if (x > grid_size.x) or (y > grid_size.y):
-                    break
+    Args:
+        arc: the 2D grid to draw into, written in place.
+        ox: x-coordinate of the centre the circle is drawn around (1-based).
+        oy: y-coordinate of the centre the circle is drawn around (1-based).
+        radius: radius of the circle [grid points].
+        cx: x-coordinate of the geometric arc centre the angles are measured from (1-based).
+        cy: y-coordinate of the geometric arc centre the angles are measured from (1-based).
+        v1x: x-component of the vector from the circle centre to the arc midpoint.
+        v1y: y-component of the vector from the circle centre to the arc midpoint.
+        l1: length of the vector from the circle centre to the arc midpoint.
+        half_arc_angle: half the angle of the arc [rad].
 
-                # add the point to the line
-                line[x - 1, y - 1] = 1
+    """
+    Nx, Ny = arc.shape
 
-                # calculate the current length of the line
-                line_length = np.sqrt((x - startpoint[0]) ** 2 + (y - startpoint[1]) ** 2)
+    # initialise loop variables
+    x = 0
+    y = radius
+    d = 1 - radius
 
-    return line
+    # draw the cardinal points
+    for px_i, py_i in ((ox, oy - y), (ox, oy + y), (ox + y, oy), (ox - y, oy)):
+        if (px_i >= 1) and (px_i <= Nx) and (py_i >= 1) and (py_i <= Ny):
+            if _in_arc_sector(px_i - cx, py_i - cy, v1x, v1y, l1, half_arc_angle):
+                arc[px_i - 1, py_i - 1] = True
 
+    # loop through the remaining points using the midpoint circle algorithm
+    while x < (y - 1):
+        x = x + 1
+        if d < 0:
+            d = d + x + x + 1
+        else:
+            y = y - 1
+            a = x - y + 1
+            d = d + a + a
 
-@typechecker
-def make_arc(
-    grid_size: Vector, arc_pos: np.ndarray, radius: Real[kt.ScalarLike, ""], diameter: Int[kt.ScalarLike, ""], focus_pos: Vector
-) -> Union[kt.NP_ARRAY_INT_2D, kt.NP_ARRAY_BOOL_2D]:
+        # loop through each point (break coding standard for readability)
+        for px_i, py_i in (
+            (x + ox, y + oy),
+            (y + ox, x + oy),
+            (y + ox, -x + oy),
+            (x + ox, -y + oy),
+            (-x + ox, -y + oy),
+            (-y + ox, -x + oy),
+            (-y + ox, x + oy),
+            (-x + ox, y + oy),
+        ):
+            if (px_i >= 1) and (px_i <= Nx) and (py_i >= 1) and (py_i <= Ny):
+                if _in_arc_sector(px_i - cx, py_i - cy, v1x, v1y, l1, half_arc_angle):
+                    arc[px_i - 1, py_i - 1] = True
+
+
+def _arc_geometry(
+    grid_size: np.ndarray, arc_pos: np.ndarray, radius: float, diameter: float, focus_pos: np.ndarray
+) -> Tuple[Tuple[int, int], bool, tuple]:
     """
-    Generates an arc shape with a given radius, diameter, and focus position.
+    Validate the inputs of `make_arc` and find how to draw the arc.
 
     Args:
         grid_size: The size of the grid, given as a 1D array with the number of pixels in each dimension.
@@ -1336,11 +1755,11 @@ def make_arc(
         focus_pos: The position of the focus, given as a 1D array with the coordinates in each dimension.
 
     Returns:
-        np.ndarray: A 2D array with the arc shape.
+        The grid size (Nx, Ny), whether the arc has a finite radius, and either the arguments of `_make_arc_core`
+        following the grid (for a finite radius) or the arguments of `_make_flat_arc` following the grid size (for an
+        infinite radius).
+
     """
-    assert len(grid_size) == 2, "The grid size must be a 2D vector."
-    assert len(arc_pos) == 2, "The arc position must be a 2D vector."
-    assert len(focus_pos) == 2, "The focus position must be a 2D vector."
 
     # force integer input values
     grid_size = grid_size.round().astype(int)
@@ -1353,8 +1772,13 @@ def make_arc(
     except OverflowError:
         radius = float(radius)
 
+    # assign variable names to vector components
+    Nx, Ny = grid_size.tolist()
+    ax, ay = arc_pos.tolist()
+    fx, fy = focus_pos.tolist()
+
     # check the input ranges
-    if np.any(grid_size < 1):
+    if Nx < 1 or Ny < 1:
         raise ValueError("The grid size must be positive.")
     if radius <= 0:
         raise ValueError("The radius must be positive.")
@@ -1362,7 +1786,7 @@ def make_arc(
     if diameter <= 0:
         raise ValueError("The diameter must be positive.")
 
-    if np.any(arc_pos < 1) or np.any(arc_pos > grid_size):
+    if ax < 1 or ay < 1 or ax > Nx or ay > Ny:
         raise ValueError("The centre of the arc must be within the grid.")
 
     if diameter > 2 * radius:
@@ -1371,70 +1795,159 @@ def make_arc(
     if diameter % 2 != 1:
         raise ValueError("The diameter must be an odd number of grid points.")
 
-    if np.all(arc_pos == focus_pos):
+    if ax == fx and ay == fy:
         raise ValueError("The focus_pos must be different to the arc_pos.")
 
-    # assign variable names to vector components
-    Nx, Ny = grid_size
-    ax, ay = arc_pos
-    fx, fy = focus_pos
+    if math.isinf(radius):
+        # calculate arc direction angle (vertical if fy == ay), then rotate by 90 degrees
+        ang = (math.atan((fx - ax) / (fy - ay)) if fy != ay else math.copysign(math.pi / 2, fx - ax)) + math.pi / 2
+        return (Nx, Ny), False, (ax, ay, ang, (diameter - 1) // 2)
+
+    # find half the arc angle
+    half_arc_angle = math.asin(diameter / 2 / radius)
+
+    # find centre of circle on which the arc lies
+    distance_cf = math.sqrt((ax - fx) ** 2 + (ay - fy) ** 2)
+    cx = round(radius / distance_cf * (fx - ax) + ax)
+    cy = round(radius / distance_cf * (fy - ay) + ay)
+
+    # form vector from the geometric arc centre to the arc midpoint
+    v1x, v1y = ax - cx, ay - cy
+
+    # calculate length of vector
+    l1 = math.sqrt(v1x**2 + v1y**2)
+
+    # the circle is drawn around a centre of zero moved to the centre of the grid, as make_circle does
+    ox = cx if cx != 0 else Nx // 2 + 1
+    oy = cy if cy != 0 else Ny // 2 + 1
+    return (Nx, Ny), True, (ox, oy, radius, cx, cy, v1x, v1y, l1, half_arc_angle)
+
+
+def _make_flat_arc(Nx: int, Ny: int, ax: int, ay: int, ang: float, half_length: int) -> kt.NP_ARRAY_BOOL_2D:
+    """
+    Draw an arc with an infinite radius as two lines leaving the arc position in opposite directions.
+
+    """
+    grid_size = Vector([Nx, Ny])
+    arc_pos = np.array([ax, ay])
+    return np.logical_or(
+        make_line(grid_size, arc_pos, endpoint=None, angle=ang, length=half_length),
+        make_line(grid_size, arc_pos, endpoint=None, angle=(ang + np.pi), length=half_length),
+    )
+
+
+@typechecker
+def make_arc(
+    grid_size: Vector, arc_pos: np.ndarray, radius: Real[kt.ScalarLike, ""], diameter: Int[kt.ScalarLike, ""], focus_pos: Vector
+) -> kt.NP_ARRAY_BOOL_2D:
+    """
+    Generates an arc shape with a given radius, diameter, and focus position.
+
+    Args:
+        grid_size: The size of the grid, given as a 1D array with the number of pixels in each dimension.
+        arc_pos: The position of the arc, given as a 1D array with the coordinates in each dimension.
+        radius: The radius of the arc.
+        diameter: The diameter of the arc.
+        focus_pos: The position of the focus, given as a 1D array with the coordinates in each dimension.
+
+    Returns:
+        np.ndarray: A 2D array with the arc shape.
+    """
+    assert len(grid_size) == 2, "The grid size must be a 2D vector."
+    assert len(arc_pos) == 2, "The arc position must be a 2D vector."
+    assert len(focus_pos) == 2, "The focus position must be a 2D vector."
+
+    (Nx, Ny), finite, params = _arc_geometry(grid_size, arc_pos, radius, diameter, focus_pos)
 
     # =========================================================================
     # CREATE ARC
     # =========================================================================
 
-    if not np.isinf(radius):
-        # find half the arc angle
-        half_arc_angle = np.arcsin(diameter / 2 / radius)
+    if finite:
+        # draw the points of the circle whose angle from the arc midpoint is not greater than the half angle of the arc
+        arc = np.zeros((Nx, Ny), dtype=bool)
+        _make_arc_core(arc, *params)
+    else:
+        # draw lines to create arc with infinite radius
+        arc = _make_flat_arc(Nx, Ny, *params)
+    return arc
 
-        # find centre of circle on which the arc lies
-        distance_cf = np.sqrt((ax - fx) ** 2 + (ay - fy) ** 2)
-        cx = round(radius / distance_cf * (fx - ax) + ax)
-        cy = round(radius / distance_cf * (fy - ay) + ay)
-        c = np.array([cx, cy])
 
-        # create circle
-        arc = make_circle(grid_size, Vector([cx, cy]), radius)
+@njit(
+    "void(b1[:, :, ::1], i8[::1], i8[::1], i8[::1], i8[::1], i8[::1], i8[::1], i8[::1], i8[::1], f8[::1], f8[::1])",
+    parallel=True,
+    cache=True,
+)
+def _make_arcs_core(
+    arcs: np.ndarray,
+    ks: np.ndarray,
+    ox: np.ndarray,
+    oy: np.ndarray,
+    radius: np.ndarray,
+    cx: np.ndarray,
+    cy: np.ndarray,
+    v1x: np.ndarray,
+    v1y: np.ndarray,
+    l1: np.ndarray,
+    half_arc_angle: np.ndarray,
+) -> None:
+    """
+    Rasterise several arcs in parallel, each into its own grid, with the arguments of `_make_arc_core` given per arc.
 
-        # form vector from the geometric arc centre to the arc midpoint
-        v1 = arc_pos - c
+    Args:
+        arcs: the stack of 2D grids to draw into, written in place.
+        ks: the index of the grid in the stack to draw each arc into.
 
-        # calculate length of vector
-        l1 = np.sqrt(sum((arc_pos - c) ** 2))
+    """
+    for i in prange(ks.size):
+        _make_arc_core(arcs[ks[i]], ox[i], oy[i], radius[i], cx[i], cy[i], v1x[i], v1y[i], l1[i], half_arc_angle[i])
 
-        # extract all points that form part of the arc
-        arc_ind = matlab_find(arc, mode="eq", val=1)
 
-        # loop through the arc points
-        for arc_ind_i in arc_ind:
-            # extract the indices of the current point
-            x_ind, y_ind = ind2sub([Nx, Ny], arc_ind_i)
-            p = np.array([x_ind, y_ind])
+@typechecker
+def make_arcs(
+    grid_size: Vector,
+    arc_pos: Real[np.ndarray, "K 2"],
+    radius: Real[np.ndarray, " K"],
+    diameter: Real[np.ndarray, " K"],
+    focus_pos: Real[np.ndarray, "K 2"],
+) -> Bool[np.ndarray, "K Nx Ny"]:
+    """
+    Generates several arc shapes, each with its own radius, diameter, and focus position.
+
+    The arcs are drawn as by `make_arc`, but are rasterised in parallel into a stack of binary maps.
+
+    Args:
+        grid_size: The size of the grid, given as a 1D array with the number of pixels in each dimension.
+        arc_pos: The positions of the arcs, given as a (K, 2) array.
+        radius: The radii of the arcs, given as a (K,) array.
+        diameter: The diameters of the arcs, given as a (K,) array.
+        focus_pos: The positions of the foci of the arcs, given as a (K, 2) array.
 
-            # form vector from the geometric arc centre to the current point
-            v2 = p - c
+    Returns:
+        np.ndarray: A (K, Nx, Ny) array with the shape of each arc.
+    """
+    assert len(grid_size) == 2, "The grid size must be a 2D vector."
 
-            # calculate length of vector
-            l2 = np.sqrt(sum((p - c) ** 2))
+    if not (len(arc_pos) == len(radius) == len(diameter) == len(focus_pos)):
+        raise ValueError("arc_pos, radius, diameter and focus_pos must describe the same number of arcs.")
 
-            # find the angle between the two vectors using the dot product,
-            # normalised using the vector lengths
-            theta = np.arccos(sum(v1 * v2 / (l1 * l2)))
+    # validate each arc and collect the arguments to draw it with
+    geometry = [_arc_geometry(grid_size, arc_pos[k], radius[k], diameter[k], focus_pos[k]) for k in range(len(arc_pos))]
+    Nx, Ny = grid_size.round().astype(int).tolist()
+    arcs = np.zeros((len(arc_pos), Nx, Ny), dtype=bool)
 
-            # if the angle is greater than the half angle of the arc, remove
-            # it from the arc
-            if theta > half_arc_angle:
-                arc = matlab_assign(arc, arc_ind_i - 1, 0)
-    else:
-        # calculate arc direction angle, then rotate by 90 degrees
-        ang = np.arctan((fx - ax) / (fy - ay)) + np.pi / 2
+    # draw the arcs with an infinite radius from lines
+    for k, (_, finite, params) in enumerate(geometry):
+        if not finite:
+            arcs[k] = _make_flat_arc(Nx, Ny, *params)
 
-        # draw lines to create arc with infinite radius
-        arc = np.logical_or(
-            make_line(grid_size, arc_pos, endpoint=None, angle=ang, length=(diameter - 1) // 2),
-            make_line(grid_size, arc_pos, endpoint=None, angle=(ang + np.pi), length=(diameter - 1) // 2),
-        )
-    return arc
+    # draw the remaining arcs in parallel
+    ks = np.array([k for k, (_, finite, _) in enumerate(geometry) if finite], dtype=np.int64)
+    params = [geometry[k][2] for k in ks]
+    ox, oy, radii, cx, cy, v1x, v1y = (np.array([p[i] for p in params], dtype=np.int64) for i in range(7))
+    l1, half_arc_angle = (np.array([p[i] for p in params], dtype=np.float64) for i in range(7, 9))
+    _make_arcs_core(arcs, ks, ox, oy, radii, cx, cy, v1x, v1y, l1, half_arc_angle)
+    return arcs
 
 
 def make_pixel_map_point(grid_size: Vector, centre_pos: np.ndarray) -> np.ndarray:
@@ -1666,9 +2179,9 @@ def make_bowl(
 
         # find centre of sphere on which the bowl lies
         distance_cf = np.sqrt((bx - fx) ** 2 + (by - fy) ** 2 + (bz - fz) ** 2)
-        cx = round(radius / distance_cf * (fx - bx) + bx)
-        cy = round(radius / distance_cf * (fy - by) + by)
-        cz = round(radius / distance_cf * (fz - bz) + bz)
+        cx = int(round(float(radius / distance_cf * (fx - bx) + bx)))
+        cy = int(round(float(radius / distance_cf * (fy - by) + by)))
+        cz = int(round(float(radius / distance_cf * (fz - bz) + bz)))
         c = np.array([cx, cy, cz])
 
         # generate matrix with distance from the centre
@@ -1807,31 +2320,25 @@ def make_bowl(
         # calculate length of vector
         l1 = np.sqrt(sum((bowl_pos_sm - c) ** 2))
 
-        # loop through the non-zero elements in the bowl matrix
-        bowl_ind = matlab_find(bowl_sm == 1)[:, 0]
-        for bowl_ind_i in bowl_ind:
-            # extract the indices of the current point
-            x_ind, y_ind, z_ind = ind2sub([Nx, Ny, Nz], bowl_ind_i)
-            p = np.array([x_ind, y_ind, z_ind])
+        # extract the indices of all the non-zero elements in the bowl matrix
+        p = np.stack(np.nonzero(bowl_sm == 1), axis=-1) + 1
 
-            # form vector from the geometric bowl centre to the current point
-            # on the bowl
-            v2 = p - c
+        # form vectors from the geometric bowl centre to the points on the bowl
+        v2 = p - c
 
-            # calculate length of vector
-            l2 = np.sqrt(sum((p - c) ** 2))
+        # calculate length of vectors
+        l2 = np.sqrt(v2[:, 0] ** 2 + v2[:, 1] ** 2 + v2[:, 2] ** 2)
 
-            # find the angle between the two vectors using the dot product,
-            # normalised using the vector lengths
-            theta = np.arccos(sum(v1 * v2 / (l1 * l2)))
+        # find the angle between the vectors using the dot product, normalised using the vector lengths (clamped, so
+        # that rounding errors for points in line with the bowl centre do not give a NaN)
+        theta = np.arccos(np.clip((v2 @ v1) / (l1 * l2), -1, 1))
 
-            #         # alternative calculation normalised using radius of curvature
-            #         theta2 = acos(sum( v1 .* v2 ./ radius**2 ))
+        #         # alternative calculation normalised using radius of curvature
+        #         theta2 = acos(sum( v1 .* v2 ./ radius**2 ))
 
-            # if the angle is greater than the half angle of the bowl, remove
-            # it from the bowl
-            if theta > half_arc_angle:
-                bowl_sm = matlab_assign(bowl_sm, bowl_ind_i - 1, 0)
+        # if the angle is greater than the half angle of the bowl, remove it from the bowl
+        outside = p[theta > half_arc_angle] - 1
+        bowl_sm[outside[:, 0], outside[:, 1], outside[:, 2]] = 0
 
     else:
         # form a distance map from the centre of the disc
@@ -1978,11 +2485,11 @@ def make_bowl(
 
             # loop through all points on the bowl, and find the all the points with
             # more than 8 neighbours
-            index = 0
-            for index, index_mat_i in enumerate(index_mat):
-                # extract subscripts for current point
-                cx, cy, cz = ind2sub([Nx, Ny, Nz], index_mat_i)
+            # extract subscripts for all the points at once
+            index_subs = np.stack(ind2sub([Nx, Ny, Nz], index_mat), axis=-1).reshape(-1, 3)
 
+            index = 0
+            for index, (cx, cy, cz) in enumerate(index_subs):
                 # ignore edge points
                 if (cx > 1) and (cx < Nx) and (cy > 1) and (cy < Ny) and (cz > 1) and (cz < Nz):
                     # extract local region around current point
@@ -2402,8 +2909,7 @@ def make_sphere(
             prev_circle = circle + circle_fill
         else:
             prev_circle_alt = circle + circle_fill
-            circle_fill = circle_fill - prev_circle
-            circle_fill[circle_fill < 0] = 0
+            circle_fill = circle_fill * (prev_circle == 0)
             sphere[centerpoints[centerpoint_index] - 1, :, :] = circle + circle_fill
             prev_circle = prev_circle_alt
 
@@ -2959,6 +3465,8 @@ def make_cart_arc(
 
     # Plot results
     if plot_arc:
+        import matplotlib.pyplot as plt
+
         # Select suitable axis scaling factor
         _, scale, prefix, _ = scale_SI(np.max(np.abs(arc)))
 
@@ -3095,6 +3603,8 @@ def make_cart_spherical_segment(
 
     # plot results
     if plot_bowl is True:
+        import matplotlib.pyplot as plt
+
         _, scale, prefix, unit = scale_SI(np.max(segment))
 
         # create the figure
@@ -120,22 +120,22 @@ def unflatten_matlab_mask(arr: np.ndarray, mask: np.ndarray, diff: Optional[int]
         return np.unravel_index(mask.ravel(order="F") + diff, arr.shape, order="F")
 
 
-def ind2sub(array_shape: Tuple[int, ...], ind: int) -> Tuple[int, ...]:
+def ind2sub(array_shape: Tuple[int, ...], ind: Union[int, np.ndarray]) -> Tuple[Union[int, np.ndarray], ...]:
     """
-    Converts a linear index to a tuple of subscript indices for an n-dimensional array.
+    Converts linear indices to a tuple of subscript indices for an n-dimensional array.
 
     Args:
         array_shape: A tuple of integers representing the shape of the array.
-        ind: The linear index to be converted.
+        ind: The linear index, or an array of linear indices, to be converted.
 
     Returns:
-        A tuple of integers representing the corresponding subscript indices.
+        A tuple with the corresponding subscript indices for each dimension, as integers for a scalar index or as
+        arrays for an array of indices.
 
     """
 
-    indices = np.unravel_index(ind - 1, array_shape, order="F")
-    indices = (np.squeeze(index) + 1 for index in indices)
-    return indices
+    indices = np.unravel_index(np.asarray(ind) - 1, array_shape, order="F")
+    return tuple(np.squeeze(index) + 1 for index in indices)
 
 
 def sub2ind(array_shape: Tuple[int, int, int], x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
@@ -3,11 +3,24 @@ from pathlib import Path
 
 import numpy as np
 import pytest
+from scipy import optimize
 
+from kwave.data import Vector
 from kwave.utils.conversion import db2neper, neper2db
 from kwave.utils.filters import extract_amp_phase, spect, apply_filter
 from kwave.utils.interp import get_bli
-from kwave.utils.mapgen import fit_power_law_params, power_law_kramers_kronig
+from kwave.utils.mapgen import (
+    fit_power_law_params,
+    get_spaced_points,
+    power_law_kramers_kronig,
+    make_arc,
+    make_arcs,
+    make_line,
+    make_lines,
+    make_pixel_map,
+    create_pixel_dim,
+    make_cart_circle,
+)
 from kwave.utils.matrix import gradient_fd, resize, num_dim, trim_zeros
 from kwave.utils.signals import tone_burst, add_noise, gradient_spect
 from tests.matlab_test_data_collectors.python_testers.utils.record_reader import TestRecordReader
@@ -149,6 +162,31 @@ def test_fit_power_law_params():
     pass
 
 
+@pytest.mark.parametrize("a0", [0.1, 1, 20])
+@pytest.mark.parametrize("y", [0.5, 0.9, 0.99, 1.1, 2.9])
+@pytest.mark.parametrize("f_min, f_max", [(1e5, 5e6), (5e6, 5e7)])
+def test_fit_power_law_params_matches_fmin(a0, y, f_min, f_max):
+    c0 = 1540
+
+    # reference fit using the NumPy form of the absorption error
+    w = 2 * np.pi * get_spaced_points(f_min, f_max, 200)
+    a0_np = db2neper(a0, y)
+    desired_absorption = a0_np * w**y
+
+    def abs_func(trial_vals):
+        a0_np_trial, y_trial = trial_vals
+        actual_absorption = (
+            a0_np_trial * w**y_trial / (1 - (y_trial + 1) * a0_np_trial * c0 * np.tan(np.pi * y_trial / 2) * w ** (y_trial - 1))
+        )
+        return np.sqrt(np.sum((desired_absorption - actual_absorption) ** 2))
+
+    a0_np_ref, y_ref = optimize.fmin(abs_func, [a0_np, y], disp=False)
+
+    a0_fit, y_fit = fit_power_law_params(a0, y, c0, f_min, f_max)
+    assert np.isclose(a0_fit, neper2db(a0_np_ref, y_ref), rtol=1e-6)
+    assert np.isclose(y_fit, y_ref, rtol=1e-6)
+
+
 def test_get_bli():
     test_signal = tone_burst(sample_freq=10_000_000, signal_freq=2.5 * 1_000_000, num_cycles=2, envelope="Gaussian")
     bli, x_fine = get_bli(test_signal)
@@ -158,6 +196,116 @@ def test_get_bli():
     pass
 
 
+def test_make_line_shallow():
+    grid_size = Vector([40, 40])
+    shallow_line = make_line(grid_size, (5, 5), (20, 12))
+    steep_line = make_line(grid_size, (5, 5), (12, 20))
+    assert shallow_line[4, 4] and shallow_line[19, 11]
+    assert np.array_equal(shallow_line, steep_line.T)
+
+
+def test_make_arc_is_binary():
+    grid_size = Vector([40, 40])
+    arc = make_arc(grid_size, np.array([20, 5]), 15, 11, Vector([20, 30]))
+    flat_arc = make_arc(grid_size, np.array([20, 5]), np.inf, 11, Vector([20, 30]))
+    assert arc.dtype == bool and flat_arc.dtype == bool
+    assert arc.sum() == flat_arc.sum() == 11
+
+
+def test_make_arc_excludes_opposite_point():
+    # the point opposite the arc midpoint gives a cosine just below -1 when rounded, which must not be kept
+    arc = make_arc(Vector([67, 44]), np.array([58, 37]), 8, 5, Vector([8, 1]))
+    assert not arc[45, 26]
+
+
+def test_make_line_return_coords():
+    grid_size = Vector([40, 30])
+    for kwargs in [dict(endpoint=(20, 12)), dict(angle=-2.0, length=25)]:
+        line = make_line(grid_size, (5, 5), **kwargs)
+        xs, ys = make_line(grid_size, (5, 5), return_coords=True, **kwargs)
+        assert np.array_equal(np.argwhere(line), np.unique(np.stack([xs, ys], axis=-1), axis=0))
+
+
+def test_make_line_huge_length():
+    # a length too large to square within an integer still runs to the edge of the grid
+    grid_size = Vector([30, 30])
+    expected = make_line(grid_size, Vector([5, 5]), angle=0.3, length=100)
+    assert np.array_equal(make_line(grid_size, Vector([5, 5]), angle=0.3, length=4 * 10**9), expected)
+
+
+def test_make_line_start_outside_grid():
+    for startpoint in [(3, 40), (2000, 3)]:
+        with pytest.raises(ValueError):
+            make_line(Vector([20, 10]), startpoint, angle=0.3, length=5)
+
+
+def test_make_lines_matches_make_line():
+    grid_size = Vector([40, 30])
+    startpoints = np.array([[5, 5], [20, 15], [40, 1], [12, 30]])
+    angles = np.array([0.3, -2.0, np.pi / 2, 3 * np.pi / 4])
+    lengths = np.array([10, 25, 50, 7])
+
+    expected = np.zeros((40, 30), dtype=bool)
+    for startpoint, angle, length in zip(startpoints, angles, lengths):
+        expected |= make_line(grid_size, startpoint, angle=angle, length=length)
+
+    assert np.array_equal(make_lines(grid_size, startpoints, angles, lengths), expected)
+
+
+def test_make_arcs_matches_make_arc():
+    grid_size = Vector([40, 30])
+    arc_pos = np.array([[20, 5], [5, 25], [30, 15], [20, 5]])
+    radius = np.array([15, 8, 40, np.inf])
+    diameter = np.array([11, 7, 21, 11])
+    focus_pos = np.array([[20, 30], [35, 1], [1, 15], [20, 30]])
+
+    expected = np.stack([make_arc(grid_size, a, r, d, Vector(f)) for a, r, d, f in zip(arc_pos, radius, diameter, focus_pos)])
+
+    arcs = make_arcs(grid_size, arc_pos, radius, diameter, focus_pos)
+    assert arcs.shape == (4, 40, 30)
+    assert np.array_equal(arcs, expected)
+
+    with pytest.raises(ValueError):
+        make_arcs(grid_size, arc_pos, radius[:3], diameter, focus_pos)
+
+
+def test_make_lines_non_finite_lengths():
+    grid_size = Vector([40, 30])
+    startpoints = np.array([[5, 5]])
+    angles = np.array([0.3])
+
+    # an infinite line runs to the edge of the grid
+    expected = make_lines(grid_size, startpoints, angles, np.array([100]))
+    assert np.array_equal(make_lines(grid_size, startpoints, angles, np.array([np.inf])), expected)
+
+    with pytest.raises(ValueError):
+        make_lines(grid_size, startpoints, angles, np.array([np.nan]))
+
+
+def test_create_pixel_dim_cached():
+    nx = create_pixel_dim(6, "single", 1)
+    assert nx is create_pixel_dim(6, "single", 1)
+    assert not nx.flags.writeable
+    assert np.array_equal(nx, [-3, -2, -1, 0, 1, 2])
+
+    # the pixel map built from the cached dimensions is still a fresh, writable array
+    r = make_pixel_map(Vector([6, 5]))
+    r[0, 0] = 0
+    assert make_pixel_map(Vector([6, 5]))[0, 0] == np.sqrt(np.float32(13))
+    assert make_pixel_map(Vector([6, 5]), dtype=np.float64)[0, 0] == np.sqrt(13)
+
+
+def test_make_cart_circle_layout():
+    circle = make_cart_circle(2.0, 12, Vector([1.0, -1.0]), np.pi)
+    circle_aos = make_cart_circle(2.0, 12, Vector([1.0, -1.0]), np.pi, layout="AoS")
+    assert circle.shape == (2, 12) and circle_aos.shape == (12, 2)
+    assert circle_aos.flags.c_contiguous
+    assert np.array_equal(circle, circle_aos.T)
+
+    with pytest.raises(ValueError):
+        make_cart_circle(2.0, 12, layout="xy")
+
+
 def test_power_kramers_kronig():
     assert 1540 == power_law_kramers_kronig(1, 1, 1540, 1, 2.5)
     assert 1540 == power_law_kramers_kronig(1, 1, 1540, 1, 1)
@@ -166,6 +314,8 @@ def test_power_kramers_kronig():
         assert ans == 1540
     assert abs(-1.4311 - power_law_kramers_kronig(3, 1, 1540, 1, 1)) < 0.001
     assert abs(1.4285 - power_law_kramers_kronig(1, 3, 1540, 1, 1)) < 0.001
+    assert isinstance(power_law_kramers_kronig(2, 1, 1540, 1, 1.5), np.float64)
+    assert power_law_kramers_kronig(np.array([1.0, 2.0]), 1, 1540, 1, 1.5).shape == (2,)
 
 
 def test_gradient_FD():